@@ -1,10 +1,53 @@
 """Data augmentation script to expand dataset to 10k samples."""
+import os
+from multiprocessing import Pool
 import pandas as pd
 import numpy as np
-import random
-from datetime import datetime, timedelta
+from datetime import datetime
 
-def augment_dataset(input_file, output_file, target_size=10000):
+# Below this many rows per worker, process start-up costs more than it saves
+MIN_CHUNK_SIZE = 50000
+
+NUMERIC_COLUMNS = [
+    'plant_age_days', 'soil_ph', 'soil_moisture_pct', 'ambient_temperature_c',
+    'ambient_humidity_pct', 'lesion_present', 'lesion_count', 'spot_size_mm'
+]
+
+def _jitter(rng, base, spread, low, high, decimals):
+    """Add uniform noise to a float column, clip and round it in one buffer."""
+    out = rng.uniform(-spread, spread, len(base))
+    np.add(out, base, out=out)
+    np.clip(out, low, high, out=out)
+    np.round(out, decimals, out=out)
+    return out
+
+def _augment_chunk(args):
+    """Apply random variations to one chunk of base columns."""
+    base, seed = args
+    rng = np.random.default_rng(seed)
+    n = len(base['soil_ph'])
+    
+    # Add random variations to numerical features
+    out = {
+        'plant_age_days': np.maximum(20, base['plant_age_days'] + rng.integers(-10, 11, n)),
+        'soil_ph': _jitter(rng, base['soil_ph'], 0.3, 5.5, 8.0, 2),
+        'soil_moisture_pct': _jitter(rng, base['soil_moisture_pct'], 5, 15, 85, 1),
+        'ambient_temperature_c': _jitter(rng, base['ambient_temperature_c'], 2, 15, 38, 1),
+        'ambient_humidity_pct': _jitter(rng, base['ambient_humidity_pct'], 5, 30, 95, 1),
+    }
+    
+    # Add variations to spot counts if disease present
+    mask = base['lesion_present'].astype(bool)
+    lesion_count = base['lesion_count']
+    spot_size = base['spot_size_mm']
+    out['lesion_count'] = np.where(
+        mask, np.maximum(0, lesion_count + rng.integers(-3, 4, n)), lesion_count
+    )
+    out['spot_size_mm'] = np.where(mask, _jitter(rng, spot_size, 1, 0, np.inf, 1), spot_size)
+    
+    return out
+
+def augment_dataset(input_file, output_file, target_size=10000, workers=None, seed=None):
     """Augment dataset by adding synthetic variations."""
     # Load original dataset
     df = pd.read_csv(input_file)
@@ -15,39 +58,42 @@ def augment_dataset(input_file, output_file, target_size=10000):
         print(f"Dataset already has {original_size} samples.")
         return
     
-    augmented_samples = []
     samples_needed = target_size - original_size
     
     print(f"Generating {samples_needed} augmented samples...")
+    seed_seq = np.random.SeedSequence(seed)
+    rng = np.random.default_rng(seed_seq)
+    
+    # Randomly select all base samples in one draw
+    augmented_df = df.sample(n=samples_needed, replace=True, random_state=rng).reset_index(drop=True)
+    
+    # Update sample_id and timestamp
+    augmented_df['sample_id'] = [
+        f"SAMPLE_{original_size + i + 1:06d}" for i in range(samples_needed)
+    ]
+    days_ago = rng.integers(0, 366, samples_needed)
+    augmented_df['timestamp'] = (
+        pd.Timestamp(datetime.now()) - pd.to_timedelta(days_ago, unit='D')
+    ).strftime('%Y-%m-%dT%H:%M:%S.%f')
+    
+    # Split the numeric work across workers, each with an independent RNG stream
+    if workers is None:
+        workers = min(os.cpu_count() or 1, max(1, samples_needed // MIN_CHUNK_SIZE))
+    bounds = np.linspace(0, samples_needed, workers + 1, dtype=np.int64)
+    tasks = [
+        ({col: augmented_df[col].to_numpy()[start:stop] for col in NUMERIC_COLUMNS}, child)
+        for start, stop, child in zip(bounds[:-1], bounds[1:], seed_seq.spawn(workers))
+    ]
+    if workers > 1:
+        with Pool(workers) as pool:
+            chunks = pool.map(_augment_chunk, tasks)
+    else:
+        chunks = [_augment_chunk(task) for task in tasks]
     
-    for i in range(samples_needed):
-        # Randomly select a base sample
-        base_sample = df.sample(n=1).iloc[0].to_dict()
-        
-        # Create variations
-        augmented = base_sample.copy()
-        
-        # Update sample_id and timestamp
-        augmented['sample_id'] = f"SAMPLE_{original_size + i + 1:06d}"
-        days_ago = random.randint(0, 365)
-        augmented['timestamp'] = (datetime.now() - timedelta(days=days_ago)).isoformat()
-        
-        # Add random variations to numerical features
-        augmented['plant_age_days'] = max(20, int(base_sample['plant_age_days'] + random.randint(-10, 10)))
-        augmented['soil_ph'] = round(max(5.5, min(8.0, base_sample['soil_ph'] + random.uniform(-0.3, 0.3))), 2)
-        augmented['soil_moisture_pct'] = round(max(15, min(85, base_sample['soil_moisture_pct'] + random.uniform(-5, 5))), 1)
-        augmented['ambient_temperature_c'] = round(max(15, min(38, base_sample['ambient_temperature_c'] + random.uniform(-2, 2))), 1)
-        augmented['ambient_humidity_pct'] = round(max(30, min(95, base_sample['ambient_humidity_pct'] + random.uniform(-5, 5))), 1)
-        
-        # Add variations to spot counts if disease present
-        if base_sample['lesion_present']:
-            augmented['lesion_count'] = max(0, int(base_sample['lesion_count'] + random.randint(-3, 3)))
-            augmented['spot_size_mm'] = round(max(0, base_sample['spot_size_mm'] + random.uniform(-1, 1)), 1)
-        
-        augmented_samples.append(augmented)
+    for col in chunks[0]:
+        augmented_df[col] = np.concatenate([chunk[col] for chunk in chunks])
     
     # Combine original and augmented data
-    augmented_df = pd.DataFrame(augmented_samples)
     final_df = pd.concat([df, augmented_df], ignore_index=True)
     
     # Save augmented dataset
@@ -62,4 +108,4 @@ if __name__ == '__main__':
         '/app/backend/data/dataset.csv',
         '/app/backend/data/dataset_10k.csv',
         target_size=10000
-    )
\ No newline at end of file
+    )
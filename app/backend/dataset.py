@@ -1,8 +1,8 @@
 """Dataset generation module for plant disease detection."""
-import random
-import csv
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
+import numpy as np
+import pandas as pd
 
 # Define crops and their common diseases
 CROPS_DISEASES = {
@@ -46,84 +46,114 @@ NUTRIENT_DEFICIENCY = [
 
 SEVERITY = ["Mild", "Moderate", "Severe"]
 
-def generate_sample(sample_id):
-    """Generate a single plant observation sample."""
-    crop_type = random.choice(list(CROPS_DISEASES.keys()))
-    disease = random.choice(CROPS_DISEASES[crop_type])
-    is_healthy = disease == "Healthy"
+def generate_chunk(rng, first_id, num_samples, now):
+    """Generate a block of samples as a DataFrame, numbered from first_id."""
+    # Every column is kept as its own compact array; string columns are held
+    # as small integer codes over a fixed category list until the CSV write
+    def categorical(codes, categories):
+        return pd.Categorical.from_codes(codes, categories=categories)
     
-    # Generate timestamp within last year
-    days_ago = random.randint(0, 365)
-    timestamp = (datetime.now() - timedelta(days=days_ago)).isoformat()
+    # Crop and disease selection via a flat (crop, disease) lookup table
+    crops = list(CROPS_DISEASES.keys())
+    disease_names, disease_table = np.unique(
+        [d for diseases in CROPS_DISEASES.values() for d in diseases], return_inverse=True
+    )
+    disease_counts = np.array([len(diseases) for diseases in CROPS_DISEASES.values()])
+    disease_offsets = np.concatenate(([0], np.cumsum(disease_counts)[:-1]))
     
-    # Plant age varies by crop
-    plant_age = random.randint(20, 150)
+    crop_idx = rng.integers(0, len(crops), num_samples, dtype=np.int8)
+    disease_idx = (rng.random(num_samples) * disease_counts[crop_idx]).astype(np.int8)
+    disease_codes = disease_table[disease_offsets[crop_idx] + disease_idx].astype(np.int8)
+    is_healthy = disease_codes == np.searchsorted(disease_names, "Healthy")
+    
+    # Generate timestamps within last year; only 366 distinct values exist
+    day_codes = rng.integers(0, 366, num_samples, dtype=np.int16)
+    days = (
+        now - pd.to_timedelta(np.arange(366), unit='D')
+    ).strftime('%Y-%m-%dT%H:%M:%S.%f')
     
     # Environmental factors
-    region = random.choice(REGIONS)
-    soil_ph = round(random.uniform(5.5, 8.0), 2)
-    soil_moisture = round(random.uniform(15, 85), 1)
-    temperature = round(random.uniform(15, 38), 1)
-    humidity = round(random.uniform(30, 95), 1)
+    region_codes = rng.integers(0, len(REGIONS), num_samples, dtype=np.int8)
+    soil_ph = rng.uniform(5.5, 8.0, num_samples).round(2).astype(np.float32)
+    soil_moisture = rng.uniform(15, 85, num_samples).round(1).astype(np.float32)
+    temperature = rng.uniform(15, 38, num_samples).round(1).astype(np.float32)
+    humidity = rng.uniform(30, 95, num_samples).round(1).astype(np.float32)
+    
+    # Visual observations: healthy leaves only take healthy colors
+    leaf_colors = LEAF_COLORS["Diseased"] + LEAF_COLORS["Healthy"]
+    n_diseased_colors = len(LEAF_COLORS["Diseased"])
+    leaf_color_codes = np.where(
+        is_healthy,
+        rng.integers(n_diseased_colors, len(leaf_colors), num_samples, dtype=np.int8),
+        rng.integers(0, len(leaf_colors), num_samples, dtype=np.int8)
+    )
+    
+    # Lesions appear on two thirds of diseased plants
+    lesion_present = ~is_healthy & (rng.integers(0, 3, num_samples, dtype=np.int8) < 2)
+    lesion_count = np.where(
+        lesion_present, rng.integers(0, 26, num_samples, dtype=np.int16), np.int16(0)
+    )
+    spot_size = np.where(
+        lesion_present, rng.uniform(0, 15, num_samples).round(1).astype(np.float32), np.float32(0.0)
+    )
     
-    # Visual observations
-    if is_healthy:
-        leaf_color = random.choice(LEAF_COLORS["Healthy"])
-        lesion_present = False
-        lesion_count = 0
-        spot_size = 0.0
-        nutrient_def = random.choice(["None", "None", "None", random.choice(NUTRIENT_DEFICIENCY[1:])])
-        severity = "None"
-    else:
-        leaf_color = random.choice(LEAF_COLORS["Diseased"] + LEAF_COLORS["Healthy"])
-        lesion_present = random.choice([True, True, False])
-        lesion_count = random.randint(0, 25) if lesion_present else 0
-        spot_size = round(random.uniform(0, 15), 1) if lesion_present else 0.0
-        nutrient_def = random.choice(NUTRIENT_DEFICIENCY)
-        severity = random.choice(SEVERITY)
+    # Healthy plants show no deficiency three times out of four
+    nutrient_codes = np.where(
+        is_healthy,
+        np.where(
+            rng.integers(0, 4, num_samples, dtype=np.int8) < 3,
+            np.int8(0),
+            rng.integers(1, len(NUTRIENT_DEFICIENCY), num_samples, dtype=np.int8)
+        ),
+        rng.integers(0, len(NUTRIENT_DEFICIENCY), num_samples, dtype=np.int8)
+    )
+    severity_codes = np.where(
+        is_healthy, np.int8(0), rng.integers(1, len(SEVERITY) + 1, num_samples, dtype=np.int8)
+    )
     
-    return {
-        "sample_id": f"SAMPLE_{sample_id:06d}",
-        "timestamp": timestamp,
-        "crop_type": crop_type,
-        "plant_age_days": plant_age,
-        "location_region": region,
+    return pd.DataFrame({
+        "sample_id": np.char.add("SAMPLE_", np.char.zfill(np.arange(first_id, first_id + num_samples).astype(str), 6)),
+        "timestamp": categorical(day_codes, days),
+        "crop_type": categorical(crop_idx, crops),
+        "plant_age_days": rng.integers(20, 151, num_samples, dtype=np.int16),
+        "location_region": categorical(region_codes, REGIONS),
         "soil_ph": soil_ph,
         "soil_moisture_pct": soil_moisture,
         "ambient_temperature_c": temperature,
         "ambient_humidity_pct": humidity,
-        "leaf_color": leaf_color,
+        "leaf_color": categorical(leaf_color_codes, leaf_colors),
         "lesion_present": lesion_present,
         "lesion_count": lesion_count,
         "spot_size_mm": spot_size,
-        "nutrient_deficiency_signs": nutrient_def,
+        "nutrient_deficiency_signs": categorical(nutrient_codes, NUTRIENT_DEFICIENCY),
         "other_notes": "",
-        "label_disease": disease,
-        "severity": severity
-    }
+        "label_disease": categorical(disease_codes, disease_names),
+        "severity": categorical(severity_codes, ["None"] + SEVERITY)
+    })
 
-def generate_dataset(num_samples=800, output_file="dataset.csv"):
+def generate_dataset(num_samples=800, output_file="dataset.csv", chunk_size=10000):
     """Generate complete dataset."""
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be at least 1, got {chunk_size}")
+    
     # Create directory structure if it doesn't exist
     output_dir = os.path.dirname(output_file)
     if output_dir:  # Only create if there's a directory path
         os.makedirs(output_dir, exist_ok=True)
     
     print(f"Generating {num_samples} samples...")
-    samples = [generate_sample(i + 1) for i in range(num_samples)]
-    
-    fieldnames = [
-        "sample_id", "timestamp", "crop_type", "plant_age_days", "location_region",
-        "soil_ph", "soil_moisture_pct", "ambient_temperature_c", "ambient_humidity_pct",
-        "leaf_color", "lesion_present", "lesion_count", "spot_size_mm",
-        "nutrient_deficiency_signs", "other_notes", "label_disease", "severity"
-    ]
+    rng = np.random.default_rng()
+    now = pd.Timestamp(datetime.now())
     
     try:
-        with open(output_file, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(samples)
+        # Stream fixed-size chunks so peak memory doesn't grow with num_samples.
+        # Default RangeIndex with index=False keeps pandas on its fast C writer path
+        if num_samples <= 0:
+            # Still write a header-only CSV, taking the columns from a throwaway row
+            generate_chunk(rng, 1, 1, now).head(0).to_csv(output_file, index=False)
+        for start in range(0, num_samples, chunk_size):
+            chunk = generate_chunk(rng, start + 1, min(chunk_size, num_samples - start), now)
+            chunk.to_csv(output_file, mode='w' if start == 0 else 'a', header=start == 0, index=False)
         
         print(f"✓ Successfully generated {num_samples} samples to {output_file}")
         print(f"✓ File location: {os.path.abspath(output_file)}")
@@ -131,7 +161,7 @@ def generate_dataset(num_samples=800, output_file="dataset.csv"):
         print(f"✗ Error writing file: {e}")
         return None
     
-    return samples
+    return output_file
 
 if __name__ == "__main__":
     # Generate dataset
@@ -1,48 +1,109 @@
 from fastapi import FastAPI, APIRouter, HTTPException
+from fastapi.responses import ORJSONResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
 import os
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional, Dict, Any
 import uuid
-from datetime import datetime, timezone
+from datetime import datetime, timezone, timedelta
 import joblib
-import pandas as pd
-import json
+import orjson
 import numpy as np
+import onnxruntime
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 # MongoDB connection
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 # Load ML model and treatments
 model_path = ROOT_DIR / 'models' / 'plant_disease_model.joblib'
+onnx_path = ROOT_DIR / 'models' / 'plant_disease_model.onnx'
 treatments_path = ROOT_DIR / 'treatments.json'
 
 model_data = None
+onnx_session = None
 treatments = {}
+encoder_maps = {}
+feature_encoders = []
+scaler_mean = None
+scaler_scale = None
+class_names = ()
+
+MAX_RECORDS_BATCH = 1000
+
+DEFAULT_TREATMENT = {
+    "treatment": "No treatment information available.",
+    "prevention": "General preventive measures recommended.",
+    "chemicals": []
+}
 
 try:
-    model_data = joblib.load(model_path)
+    # Build every derived cache from a local bundle and publish it last, so
+    # model_data is only set once prediction is known to work
+    bundle = joblib.load(model_path)
+    # Cache class -> code lookups so requests don't go through LabelEncoder
+    encoder_maps = {
+        col: {cls: i for i, cls in enumerate(encoder.classes_)}
+        for col, encoder in bundle['label_encoders'].items()
+    }
+    # Expand the scaler statistics to the full feature row so scaling is a
+    # plain subtract/divide; unscaled columns get mean 0 and scale 1. Older
+    # bundles scaled every feature, newer ones leave categorical codes as-is
+    feature_columns = bundle['feature_columns']
+    feature_encoders = [(col, encoder_maps.get(col)) for col in feature_columns]
+    scaled_idx = [
+        feature_columns.index(col)
+        for col in bundle.get('scaled_columns', feature_columns)
+    ]
+    scaler_mean = np.zeros(len(feature_columns), dtype=np.float64)
+    scaler_scale = np.ones(len(feature_columns), dtype=np.float64)
+    scaler_mean[scaled_idx] = bundle['scaler'].mean_
+    scaler_scale[scaled_idx] = bundle['scaler'].scale_
+    class_names = tuple(bundle['model'].classes_.tolist())
+    model_data = bundle
     print("✓ Model loaded successfully")
 except Exception as e:
     print(f"✗ Error loading model: {e}")
 
 try:
-    with open(treatments_path, 'r') as f:
-        treatments = json.load(f)
+    session = onnxruntime.InferenceSession(
+        str(onnx_path), providers=['CPUExecutionProvider']
+    )
+    # Labels come from the joblib bundle, so only trust an export whose
+    # input and probability widths match it
+    if model_data is None:
+        raise ValueError("joblib model bundle is not loaded")
+    input_width = session.get_inputs()[0].shape[-1]
+    output_width = next(
+        out.shape[-1] for out in session.get_outputs() if out.name == 'probabilities'
+    )
+    if input_width != len(model_data['feature_columns']) or output_width != len(class_names):
+        raise ValueError(
+            f"export has {input_width} features and {output_width} classes, "
+            f"bundle has {len(model_data['feature_columns'])} and {len(class_names)}"
+        )
+    onnx_session = session
+    print("✓ ONNX inference session loaded successfully")
+except Exception as e:
+    print(f"✗ ONNX model unavailable, falling back to sklearn: {e}")
+
+try:
+    with open(treatments_path, 'rb') as f:
+        treatments = orjson.loads(f.read())
     print("✓ Treatment data loaded successfully")
 except Exception as e:
     print(f"✗ Error loading treatments: {e}")
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 api_router = APIRouter(prefix="/api")
 
 # Models
@@ -67,6 +128,9 @@ class PredictionResponse(BaseModel):
     treatment: Optional[Dict[str, Any]] = None
     timestamp: str
 
+class PredictionBatchInput(BaseModel):
+    items: List[PredictionInput]
+
 class SubmissionRecord(BaseModel):
     model_config = ConfigDict(extra="ignore")
     
@@ -103,6 +167,17 @@ class SubmissionCreate(BaseModel):
     predicted_disease: str
     confidence: float
 
+class SubmissionBatchCreate(BaseModel):
+    items: List[SubmissionCreate] = Field(max_length=MAX_RECORDS_BATCH)
+
+class SubmissionBatchError(BaseModel):
+    index: int
+    error: str
+
+class SubmissionBatchResponse(BaseModel):
+    inserted: List[SubmissionRecord]
+    failed: List[SubmissionBatchError]
+
 class StatsResponse(BaseModel):
     total_predictions: int
     disease_distribution: Dict[str, int]
@@ -111,37 +186,51 @@ class StatsResponse(BaseModel):
     crops_analyzed: Dict[str, int]
 
 # Helper functions
-def preprocess_input(input_data: dict, model_data: dict):
-    """Preprocess input data for prediction."""
-    # Create DataFrame with single row
-    df = pd.DataFrame([input_data])
+def preprocess_batch(inputs: List[PredictionInput]):
+    """Preprocess a list of inputs into one scaled feature matrix."""
+    # Fill one feature row per input in training column order, reading
+    # fields straight off the request models
+    X = np.empty((len(inputs), len(feature_encoders)), dtype=np.float64)
+    for row, input_data in enumerate(inputs):
+        for i, (col, mapping) in enumerate(feature_encoders):
+            value = getattr(input_data, col, 0)
+            if mapping is not None:
+                # Unseen categories are encoded as -1
+                X[row, i] = mapping.get(str(value), -1)
+            else:
+                X[row, i] = float(value)
     
-    # Get feature columns and encoders from model
-    feature_columns = model_data['feature_columns']
-    label_encoders = model_data['label_encoders']
-    scaler = model_data['scaler']
-    
-    # Ensure all feature columns are present
-    for col in feature_columns:
-        if col not in df.columns:
-            df[col] = 0
-    
-    # Select only the feature columns in correct order
-    df = df[feature_columns]
-    
-    # Encode categorical variables
-    for col, encoder in label_encoders.items():
-        if col in df.columns:
-            try:
-                df[col] = encoder.transform(df[col].astype(str))
-            except ValueError:
-                # Handle unseen categories
-                df[col] = -1
+    # Scale numerical features
+    X -= scaler_mean
+    X /= scaler_scale
+    return X
+
+def preprocess_input(input_data: PredictionInput):
+    """Preprocess input data for prediction."""
+    return preprocess_batch([input_data])
+
+def predict_proba(X):
+    """Return class probabilities, using ONNX Runtime when available."""
+    if onnx_session is not None:
+        return onnx_session.run(['probabilities'], {'X': X.astype(np.float32)})[0]
+    return model_data['model'].predict_proba(X)
+
+def build_prediction(probabilities, timestamp: str):
+    """Build a prediction response from one row of class probabilities."""
+    best = int(probabilities.argmax())
+    prediction = class_names[best]
+    prob_dict = dict(zip(class_names, probabilities.tolist()))
     
-    # Scale features
-    X_scaled = scaler.transform(df)
+    # Get treatment information
+    treatment_info = treatments.get(prediction) or DEFAULT_TREATMENT
     
-    return X_scaled
+    return PredictionResponse(
+        prediction=prediction,
+        confidence=float(probabilities[best]),
+        all_probabilities=prob_dict,
+        treatment=treatment_info,
+        timestamp=timestamp
+    )
 
 # Endpoints
 @api_router.get("/")
@@ -156,38 +245,40 @@ async def predict_disease(input_data: PredictionInput):
     
     try:
         # Preprocess input
-        input_dict = input_data.model_dump()
-        X = preprocess_input(input_dict, model_data)
+        X = preprocess_input(input_data)
         
         # Make prediction
-        model = model_data['model']
-        prediction = model.predict(X)[0]
-        probabilities = model.predict_proba(X)[0]
-        
-        # Get class names and probabilities
-        classes = model.classes_
-        prob_dict = {cls: float(prob) for cls, prob in zip(classes, probabilities)}
-        confidence = float(max(probabilities))
-        
-        # Get treatment information
-        treatment_info = treatments.get(prediction, {
-            "treatment": "No treatment information available.",
-            "prevention": "General preventive measures recommended.",
-            "chemicals": []
-        })
+        probabilities = predict_proba(X)[0]
         
-        return PredictionResponse(
-            prediction=prediction,
-            confidence=confidence,
-            all_probabilities=prob_dict,
-            treatment=treatment_info,
-            timestamp=datetime.now(timezone.utc).isoformat()
-        )
+        return build_prediction(probabilities, datetime.now(timezone.utc).isoformat())
     
     except Exception as e:
         logging.error(f"Prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+@api_router.post("/predict/batch", response_model=List[PredictionResponse])
+async def predict_disease_batch(input_data: PredictionBatchInput):
+    """Predict plant diseases for many samples with a single model call."""
+    if not model_data:
+        raise HTTPException(status_code=500, detail="Model not loaded")
+    
+    if not input_data.items:
+        return []
+    
+    try:
+        # Preprocess all inputs into one matrix
+        X = preprocess_batch(input_data.items)
+        
+        # Make predictions
+        probabilities = predict_proba(X)
+        
+        timestamp = datetime.now(timezone.utc).isoformat()
+        return [build_prediction(row, timestamp) for row in probabilities]
+    
+    except Exception as e:
+        logging.error(f"Batch prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
 @api_router.post("/records", response_model=SubmissionRecord)
 async def create_record(input_data: SubmissionCreate):
     """Save a prediction record to database."""
@@ -195,8 +286,8 @@ async def create_record(input_data: SubmissionCreate):
         record_dict = input_data.model_dump()
         record_obj = SubmissionRecord(**record_dict)
         
+        # Timestamp is stored as a native BSON date so range queries use the index
         doc = record_obj.model_dump()
-        doc['timestamp'] = doc['timestamp'].isoformat()
         
         await db.predictions.insert_one(doc)
         return record_obj
@@ -205,6 +296,37 @@ async def create_record(input_data: SubmissionCreate):
         logging.error(f"Record creation error: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to save record: {str(e)}")
 
+@api_router.post("/records/batch", response_model=SubmissionBatchResponse)
+async def create_records_batch(input_data: SubmissionBatchCreate):
+    """Save many prediction records in a single database round-trip."""
+    if not input_data.items:
+        return SubmissionBatchResponse(inserted=[], failed=[])
+    
+    try:
+        records = [SubmissionRecord(**item.model_dump()) for item in input_data.items]
+        docs = [record.model_dump() for record in records]
+        
+        # Unordered insert keeps going past individual failures
+        await db.predictions.insert_many(docs, ordered=False)
+        return SubmissionBatchResponse(inserted=records, failed=[])
+    
+    except BulkWriteError as e:
+        # Everything except the reported documents was written; tell the
+        # client which items failed so a retry doesn't duplicate the rest
+        write_errors = e.details.get("writeErrors", [])
+        failed_idx = {err["index"] for err in write_errors}
+        logging.error(f"Batch record creation: {len(failed_idx)} of {len(records)} failed")
+        return SubmissionBatchResponse(
+            inserted=[record for i, record in enumerate(records) if i not in failed_idx],
+            failed=[
+                SubmissionBatchError(index=err["index"], error=err.get("errmsg", "Write failed"))
+                for err in write_errors
+            ]
+        )
+    except Exception as e:
+        logging.error(f"Batch record creation error: {e}")
+        raise HTTPException(status_code=500, detail=f"Failed to save records: {str(e)}")
+
 @api_router.get("/records", response_model=List[SubmissionRecord])
 async def get_records(limit: int = 100, skip: int = 0):
     """Get all prediction records."""
@@ -265,33 +387,45 @@ async def get_stats():
     """Get dashboard statistics."""
     try:
         # Total predictions
-        total = await db.predictions.count_documents({})
+        total = await db.predictions.estimated_document_count()
         
-        # Disease distribution
-        pipeline = [
-            {"$group": {"_id": "$predicted_disease", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        disease_dist = await db.predictions.aggregate(pipeline).to_list(100)
-        disease_distribution = {item["_id"]: item["count"] for item in disease_dist}
+        # Disease, crop, confidence and recent counts in a single pass
+        week_ago = datetime.now(timezone.utc) - timedelta(days=7)
+        # Records saved before timestamps became BSON dates hold ISO strings,
+        # which Mongo orders before every date; compare those as strings
+        recent_match = {"$or": [
+            {"$gte": ["$timestamp", week_ago]},
+            {"$and": [
+                {"$eq": [{"$type": "$timestamp"}, "string"]},
+                {"$gte": ["$timestamp", week_ago.isoformat()]}
+            ]}
+        ]}
+        pipeline = [{"$facet": {
+            "disease": [
+                {"$group": {"_id": "$predicted_disease", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": 100}
+            ],
+            "crop": [
+                {"$group": {"_id": "$crop_type", "count": {"$sum": 1}}},
+                {"$sort": {"count": -1}},
+                {"$limit": 100}
+            ],
+            "summary": [
+                {"$group": {
+                    "_id": None,
+                    "avg_confidence": {"$avg": "$confidence"},
+                    "recent": {"$sum": {"$cond": [recent_match, 1, 0]}}
+                }}
+            ]
+        }}]
+        facets = (await db.predictions.aggregate(pipeline).to_list(1))[0]
         
-        # Crop distribution
-        crop_pipeline = [
-            {"$group": {"_id": "$crop_type", "count": {"$sum": 1}}},
-            {"$sort": {"count": -1}}
-        ]
-        crop_dist = await db.predictions.aggregate(crop_pipeline).to_list(100)
-        crops_analyzed = {item["_id"]: item["count"] for item in crop_dist}
-        
-        # Average confidence
-        avg_pipeline = [{"$group": {"_id": None, "avg_confidence": {"$avg": "$confidence"}}}]
-        avg_result = await db.predictions.aggregate(avg_pipeline).to_list(1)
-        avg_confidence = avg_result[0]["avg_confidence"] if avg_result else 0.0
-        
-        # Recent predictions (last 7 days)
-        from datetime import timedelta
-        week_ago = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
-        recent = await db.predictions.count_documents({"timestamp": {"$gte": week_ago}})
+        disease_distribution = {item["_id"]: item["count"] for item in facets["disease"]}
+        crops_analyzed = {item["_id"]: item["count"] for item in facets["crop"]}
+        summary = facets["summary"][0] if facets["summary"] else {}
+        avg_confidence = summary.get("avg_confidence") or 0.0
+        recent = summary.get("recent", 0)
         
         return StatsResponse(
             total_predictions=total,
@@ -311,8 +445,7 @@ async def get_diseases():
     if not model_data:
         raise HTTPException(status_code=500, detail="Model not loaded")
     
-    model = model_data['model']
-    diseases = model.classes_.tolist()
+    diseases = list(class_names)
     
     return {"diseases": diseases, "count": len(diseases)}
 
@@ -332,6 +465,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@app.on_event("startup")
+async def create_indexes():
+    try:
+        await db.predictions.create_index([("timestamp", -1)])
+    except Exception as e:
+        logger.error(f"Error creating indexes: {e}")
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
     client.close()
\ No newline at end of file